@@ -3,6 +3,8 @@
 UDP MJPEG client with:
  - Heartbeat on port 8030
  - Fragmented MJPEG packet reconstruction (linear buffer)
+ - Batched UDP receive via recvmmsg (Linux), recvfrom elsewhere
+ - JPEG decode and display on a separate thread from reception
  - Frame timeout
  - Single frame save via 's' key
  - Remote event frame save via port 50000
@@ -10,13 +12,28 @@ UDP MJPEG client with:
 """
 
 import socket
+import sys
 import threading
+import itertools
+import queue
 import time
+import select
+import inspect
+import struct
+import errno
+import os
+import ctypes
+import ctypes.util
 import cv2
 import numpy as np
 import datetime
 import argparse
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+except ImportError:
+    TurboJPEG = None
+
 # -------------------------
 # Server and protocol configuration
 # -------------------------
@@ -30,6 +47,31 @@ STOP_MSG  = bytes.fromhex("999902000000000000000000000000000000000000000000")
 HEARTBEAT_INTERVAL = 0.5
 SOCKET_TIMEOUT = 1.0
 FRAME_TIMEOUT = 1.0
+FRAME_TIMEOUT_NS = int(FRAME_TIMEOUT * 1_000_000_000)
+
+# Size of each preallocated frame reconstruction buffer, and number of buffers:
+# one being assembled, one waiting for the display thread, one being decoded
+MAX_FRAME_SIZE = 2 * 1024 * 1024
+FRAME_BUFFERS = 3
+
+# Without cv2.pollKey (OpenCV < 4.5.3), poll the keyboard with waitKey(1)
+# only once every KEY_POLL_FRAMES displayed frames
+KEY_POLL_FRAMES = 3
+
+# Kernel receive buffer for the MJPEG socket (Linux caps it to net.core.rmem_max)
+SOCKET_RCVBUF = 8 * 1024 * 1024
+
+# Batched receive (recvmmsg): datagrams per syscall and size of each slot
+RECV_BATCH = 32
+RECV_BUFSIZE = 65536
+
+# MJPEG fragment header (24 bytes): 0x66, flag, 0x01, frame id, frame size,
+# 4 reserved, fragment index, fragment size, 8 reserved.
+# The first 4 bytes are read as one little-endian word: bytes 0 and 2 are
+# checked together with a mask, bytes 1 and 3 are the flag and frame id.
+MJPEG_HEADER = struct.Struct("<II4xHH8x")
+MJPEG_MAGIC_MASK = 0x00FF00FF
+MJPEG_MAGIC = 0x00010066
 
 # Event listener config (port 50000)
 EVENT_PORT = 50000
@@ -48,47 +90,55 @@ EVENT_RESPONSE_MIDDLE = bytes.fromhex("00 00 90 00 04 00")
 # -------------------------
 running = True
 
-# Current frame reconstruction
-current_frame = {
-    "id": None,
-    "size": None,
-    "buffer": bytearray(),
-    "expected_frag": 0,
-    "start_time": None
-}
+# Current frame reconstruction (fragments are copied into a preallocated buffer)
+class FrameState:
+    """State of the frame being reconstructed."""
+    __slots__ = ("id", "size", "buf", "offset", "expected_frag", "start_ns")
+
+    def __init__(self):
+        self.id = None
+        self.size = None
+        self.buf = memoryview(bytearray(MAX_FRAME_SIZE))
+        self.offset = 0
+        self.expected_frag = 0
+        self.start_ns = None
+
+current_frame = FrameState()
 
-# Statistics
+# Statistics (frames_undecodable is only updated by the display thread, and
+# frames_decoded by the display thread or, with --save, by the receive loop;
+# the others only by the receive loop)
 frames_decoded = 0
 frames_dropped = 0
+frames_undecodable = 0
 fragments_received = 0
 
-# Remote event signaling
-event_signal = threading.Event()
+# Completed JPEG frames handed to the display thread (newest frame wins),
+# as views of their reconstruction buffer, and the buffers not in use
+jpeg_queue = queue.Queue(maxsize=1)
+_free_frame_buffers = [bytearray(MAX_FRAME_SIZE) for _ in range(FRAME_BUFFERS - 1)]
+
+# Remote event signaling: event_flag is set to 1 by the event thread and reset
+# to 0 by the display thread; the event counters are only used by the event thread
+event_flag = 0
 _last_server_event_counter = None
-_last_server_event_counter_lock = threading.Lock()
 
 # Event request counter
-_event_request_counter = 0
-_event_request_counter_lock = threading.Lock()
+_event_request_counter = itertools.count()
 
 # -------------------------
 # Auxiliary functions
 # -------------------------
 def send_heartbeat(sock):
-    """Thread to periodically send heartbeat to the server."""
-    while running:
-        try:
-            sock.sendto(HEARTBEAT, (SERVER_IP, SERVER_PORT))
-        except Exception as e:
-            print("[heartbeat] Send error:", e)
-        time.sleep(HEARTBEAT_INTERVAL)
+    """Sends one heartbeat to the server."""
+    try:
+        sock.sendto(HEARTBEAT, (SERVER_IP, SERVER_PORT))
+    except Exception as e:
+        print("[heartbeat] Send error:", e)
 
 def build_event_request():
     """Builds 18-byte event request packet with incremental counter."""
-    global _event_request_counter
-    with _event_request_counter_lock:
-        cnt = _event_request_counter
-        _event_request_counter = (_event_request_counter + 1) & 0xFFFF
+    cnt = next(_event_request_counter) & 0xFFFF
     packet = bytearray()
     packet += EVENT_REQUEST_PREFIX
     packet += cnt.to_bytes(2, "little")
@@ -118,121 +168,343 @@ def parse_event_packet(data: bytes, expected_request_counter: int) -> bool:
 
     server_event_counter = int.from_bytes(data[18:20], "little")
 
-    with _last_server_event_counter_lock:
-        if _last_server_event_counter is None:
-            _last_server_event_counter = server_event_counter
-            return False
+    if _last_server_event_counter is None:
+        _last_server_event_counter = server_event_counter
+        return False
 
-        if server_event_counter == _last_server_event_counter:
-            return False
+    if server_event_counter == _last_server_event_counter:
+        return False
 
-        # New event detected
-        _last_server_event_counter = server_event_counter
-        return True
+    # New event detected
+    _last_server_event_counter = server_event_counter
+    return True
 
-def event_listener():
-    """Thread to send event requests and check server responses."""
-    global running
+def control_loop(stream_sock):
+    """
+    Thread to send heartbeats on the MJPEG socket and event requests on port
+    50000, checking event responses.
+    It wakes up every EVENT_INTERVAL to send an event request, plus the heartbeat
+    when that is due too; until the next request the thread blocks in recv
+    waiting for the response instead of sleeping.
+    """
+    global event_flag
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.settimeout(0.03)
+    buf = bytearray(256)
+    view = memoryview(buf)
+    next_heartbeat = time.monotonic()
     try:
         while running:
+            now = time.monotonic()
+            if now >= next_heartbeat:
+                send_heartbeat(stream_sock)
+                next_heartbeat += HEARTBEAT_INTERVAL
+                if next_heartbeat < now:
+                    next_heartbeat = now + HEARTBEAT_INTERVAL
+
+            req_packet, req_counter = build_event_request()
+            deadline = now + EVENT_INTERVAL
             try:
-                req_packet, req_counter = build_event_request()
-                try:
-                    sock.sendto(req_packet, (SERVER_IP, EVENT_PORT))
-                except Exception:
-                    time.sleep(EVENT_INTERVAL)
-                    continue
+                sock.sendto(req_packet, (SERVER_IP, EVENT_PORT))
+            except Exception:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                continue
 
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
                 try:
-                    data, _ = sock.recvfrom(256)
-                    if data:
-                        if parse_event_packet(data, req_counter):
-                            event_signal.set()
+                    n = sock.recv_into(buf)
                 except socket.timeout:
-                    pass
-            except Exception:
-                pass
-            time.sleep(EVENT_INTERVAL)
+                    break
+                except OSError:
+                    # e.g. ICMP port unreachable: wait for the next request slot
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+                    break
+                if parse_event_packet(view[:n], req_counter):
+                    event_flag = 1
     finally:
         sock.close()
 
+# -------------------------
+# Batched UDP receive (recvmmsg)
+# -------------------------
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_iovec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr),
+                ("msg_len", ctypes.c_uint)]
+
+def _load_recvmmsg():
+    """Returns libc recvmmsg() through ctypes, or None if not available (non-Linux)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        func = libc.recvmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_mmsghdr), ctypes.c_uint,
+                     ctypes.c_int, ctypes.c_void_p]
+    func.restype = ctypes.c_int
+    return func
+
+_recvmmsg = _load_recvmmsg()
+
+class BatchReceiver:
+    """
+    Receives up to RECV_BATCH datagrams per syscall with recvmmsg().
+    Datagrams land in a preallocated buffer that is reused on every call,
+    so the returned memoryviews are only valid until the next recv().
+    Where recvmmsg() is missing, falls back to one recv_into() per call on
+    the same buffer, so no bytes object is allocated per datagram either way.
+    """
+    def __init__(self, sock, batch=RECV_BATCH, bufsize=RECV_BUFSIZE):
+        self.sock = sock
+        self.batch = batch
+        self.buffer = bytearray(batch * bufsize)
+        view = memoryview(self.buffer)
+        self.slots = [view[i * bufsize:(i + 1) * bufsize] for i in range(batch)]
+
+        if _recvmmsg is not None:
+            self._cbuf = (ctypes.c_char * len(self.buffer)).from_buffer(self.buffer)
+            base = ctypes.addressof(self._cbuf)
+            self.iovecs = (_iovec * batch)()
+            self.msgs = (_mmsghdr * batch)()
+            for i in range(batch):
+                self.iovecs[i].iov_base = base + i * bufsize
+                self.iovecs[i].iov_len = bufsize
+                self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+                self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def recv(self):
+        """Waits up to SOCKET_TIMEOUT for data and returns the list of received datagrams."""
+        if _recvmmsg is None:
+            slot = self.slots[0]
+            n = self.sock.recv_into(slot)
+            return [slot[:n]]
+
+        ready, _, _ = select.select([self.sock], [], [], SOCKET_TIMEOUT)
+        if not ready:
+            raise socket.timeout
+
+        n = _recvmmsg(self.sock.fileno(), self.msgs, self.batch, socket.MSG_DONTWAIT, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        msgs = self.msgs
+        slots = self.slots
+        return [slots[i][:msgs[i].msg_len] for i in range(n)]
+
 # -------------------------
 # MJPEG packet parsing and reconstruction
 # -------------------------
+# Monotonic integer clock for frame timeouts (no float per fragment)
+_now_ns = time.monotonic_ns
+
 def parse_mjpeg_packet(data: bytes):
+    """
+    Parse one MJPEG fragment packet.
+    Returns (flag, frame_id, frame_size, frag_index, payload) or None if invalid;
+    payload is a memoryview into data, valid as long as data is.
+    """
     if len(data) < 24:
         return None
-    header = data[:24]
-    payload = data[24:]
-
-    if header[0] != 0x66 or header[2] != 0x01:
+    word, frame_size, frag_index, frag_size = MJPEG_HEADER.unpack_from(data)
+    if word & MJPEG_MAGIC_MASK != MJPEG_MAGIC:
         return None
+    frame_flag = (word >> 8) & 0xFF
+    frame_id = word >> 24
 
-    frame_flag = header[1]
-    frame_id   = header[3]
-    frame_size = int.from_bytes(header[4:8], "little")
-    frag_index = int.from_bytes(header[12:14], "little")
-    frag_size  = int.from_bytes(header[14:16], "little")
-
+    payload = memoryview(data)[24:]
     if len(payload) != frag_size:
         return None
 
-    return {
-        "flag": frame_flag,
-        "id": frame_id,
-        "size": frame_size,
-        "frag_index": frag_index,
-        "data": payload
-    }
+    return frame_flag, frame_id, frame_size, frag_index, payload
 
 def process_fragment(frame_state, fragment):
     global frames_dropped
-    flag = fragment["flag"]
-    frag_index = fragment["frag_index"]
+    flag, frame_id, frame_size, frag_index, data = fragment
 
     if flag == 1:
-        frame_state["id"] = fragment["id"]
-        frame_state["size"] = fragment["size"]
-        frame_state["buffer"] = bytearray()
-        frame_state["expected_frag"] = 0
-        frame_state["start_time"] = time.time()
-
-    if frame_state["start_time"] is not None:
-        if time.time() - frame_state["start_time"] > FRAME_TIMEOUT:
-            frame_state["buffer"] = bytearray()
-            frame_state["expected_frag"] = 0
-            frame_state["start_time"] = None
+        frame_state.id = frame_id
+        frame_state.size = frame_size
+        frame_state.offset = 0
+        frame_state.expected_frag = 0
+        frame_state.start_ns = _now_ns()
+    elif frame_state.start_ns is not None:
+        if _now_ns() - frame_state.start_ns > FRAME_TIMEOUT_NS:
+            frame_state.offset = 0
+            frame_state.expected_frag = 0
+            frame_state.start_ns = None
             frames_dropped += 1
             return None
 
-    if frag_index != frame_state["expected_frag"]:
-        frame_state["buffer"] = bytearray()
-        frame_state["expected_frag"] = 0
-        frame_state["start_time"] = None
+    if frag_index != frame_state.expected_frag:
+        frame_state.offset = 0
+        frame_state.expected_frag = 0
+        frame_state.start_ns = None
+        frames_dropped += 1
+        return None
+
+    offset = frame_state.offset
+    end = offset + len(data)
+    if end > MAX_FRAME_SIZE:
+        frame_state.offset = 0
+        frame_state.expected_frag = 0
+        frame_state.start_ns = None
         frames_dropped += 1
         return None
 
-    frame_state["buffer"] += fragment["data"]
-    frame_state["expected_frag"] += 1
+    frame_state.buf[offset:end] = data
+    frame_state.offset = end
+    frame_state.expected_frag += 1
 
     if flag == 2:
-        if len(frame_state["buffer"]) == frame_state["size"]:
-            jpeg = bytes(frame_state["buffer"])
-            frame_state["buffer"] = bytearray()
-            frame_state["expected_frag"] = 0
-            frame_state["start_time"] = None
+        if end == frame_state.size:
+            jpeg = frame_state.buf[:end]
+            frame_state.offset = 0
+            frame_state.expected_frag = 0
+            frame_state.start_ns = None
             return jpeg
         else:
-            frame_state["buffer"] = bytearray()
-            frame_state["expected_frag"] = 0
-            frame_state["start_time"] = None
+            frame_state.offset = 0
+            frame_state.expected_frag = 0
+            frame_state.start_ns = None
             frames_dropped += 1
             return None
 
     return None
 
+def write_all(f, data):
+    """Writes the whole buffer to an unbuffered file, retrying after short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+# -------------------------
+# Decode and display
+# -------------------------
+def queue_frame(jpeg_bytes):
+    """
+    Hands a completed frame to the display thread, replacing any frame not yet
+    taken; the replaced frame counts as dropped and its buffer goes back to the
+    free pool.
+    """
+    global frames_dropped
+    try:
+        jpeg_queue.put_nowait(jpeg_bytes)
+    except queue.Full:
+        try:
+            _free_frame_buffers.append(jpeg_queue.get_nowait().obj)
+            frames_dropped += 1
+        except queue.Empty:
+            pass
+        jpeg_queue.put_nowait(jpeg_bytes)
+
+def _load_turbojpeg():
+    """
+    Returns (decoder, dst_supported): a TurboJPEG decoder, or None if PyTurboJPEG
+    or libturbojpeg is missing, and whether its decode() accepts dst (2.x only).
+    """
+    if TurboJPEG is None:
+        return None, False
+    try:
+        tj = TurboJPEG()
+    except (OSError, RuntimeError):
+        return None, False
+    return tj, "dst" in inspect.signature(tj.decode).parameters
+
+def decode_jpeg(tj, jpeg_bytes, dst=None):
+    """
+    Decodes a JPEG frame to a BGR image, or returns None if it is corrupted.
+    With TurboJPEG the image is decoded straight into dst when given, reused
+    across frames as long as the frame size does not change; otherwise
+    cv2.imdecode is used.
+    """
+    if tj is None:
+        return cv2.imdecode(np.frombuffer(jpeg_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    try:
+        if dst is None:
+            return tj.decode(jpeg_bytes, pixel_format=TJPF_BGR)
+        try:
+            return tj.decode(jpeg_bytes, pixel_format=TJPF_BGR, dst=dst)
+        except ValueError:
+            # Frame size changed, dst no longer fits
+            return tj.decode(jpeg_bytes, pixel_format=TJPF_BGR)
+    except OSError:
+        return None
+
+def display_worker():
+    """
+    Thread to decode and display frames, so JPEG decoding never delays reception.
+    Owns every OpenCV HighGUI call (window, imshow, key polling).
+    """
+    global running, frames_decoded, frames_undecodable, event_flag
+    tj, tj_dst = _load_turbojpeg()
+    poll_key = getattr(cv2, "pollKey", None)
+    img = None
+    shown = 0
+    cv2.namedWindow("MJPEG Stream", cv2.WINDOW_NORMAL)
+    try:
+        while running:
+            try:
+                jpeg_bytes = jpeg_queue.get(timeout=SOCKET_TIMEOUT)
+            except queue.Empty:
+                continue
+
+            decoded = decode_jpeg(tj, jpeg_bytes, img if tj_dst else None)
+            _free_frame_buffers.append(jpeg_bytes.obj)
+            if decoded is None:
+                frames_undecodable += 1
+                continue
+            img = decoded
+            frames_decoded += 1
+
+            if event_flag:
+                tsf = datetime.datetime.now().strftime("%d%m%Y-%H%M%S")
+                fname = f"frame_{tsf}.jpg"
+                try:
+                    cv2.imwrite(fname, img)
+                    print(f"[event] Frame saved due to remote event: {fname}")
+                except Exception as e:
+                    print("[event] Error saving frame:", e)
+                event_flag = 0
+
+            cv2.imshow("MJPEG Stream", img)
+            shown += 1
+            if poll_key is not None:
+                key = poll_key() & 0xFF
+            elif shown % KEY_POLL_FRAMES == 0:
+                key = cv2.waitKey(1) & 0xFF
+            else:
+                continue
+            if key == ord('q'):
+                running = False
+                break
+            elif key == ord('s'):
+                tsf = datetime.datetime.now().strftime("%d%m%Y-%H%M%S")
+                fname = f"frame_{tsf}.jpg"
+                cv2.imwrite(fname, img)
+                print(f"[main] Frame saved: {fname}")
+    finally:
+        # However the display ends, stop the client instead of receiving headless
+        running = False
+        cv2.destroyAllWindows()
+
 # -------------------------
 # Main loop
 # -------------------------
@@ -241,71 +513,66 @@ def main(save_mjpeg=False):
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.settimeout(SOCKET_TIMEOUT)
-
-    threading.Thread(target=send_heartbeat, args=(sock,), daemon=True).start()
-    threading.Thread(target=event_listener, daemon=True).start()
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+    except OSError as e:
+        print("[main] Cannot set UDP receive buffer:", e)
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if sys.platform.startswith("linux"):
+        # Linux reports twice the size actually granted (see socket(7))
+        rcvbuf //= 2
+    if rcvbuf < SOCKET_RCVBUF:
+        print(f"[main] UDP receive buffer is {rcvbuf} bytes (requested {SOCKET_RCVBUF}), "
+              f"fragments may be dropped; raise net.core.rmem_max")
+    receiver = BatchReceiver(sock)
+
+    threading.Thread(target=control_loop, args=(sock,), daemon=True).start()
 
     if save_mjpeg:
         ts = datetime.datetime.now().strftime("%d%m%Y-%H%M%S")
         mjpeg_filename = f"stream_{ts}.mjpeg"
-        mjpeg_file = open(mjpeg_filename, "wb")
+        # Unbuffered: frames are large, copying them through a small buffer only costs
+        mjpeg_file = open(mjpeg_filename, "wb", buffering=0)
         print(f"[main] Saving MJPEG stream to '{mjpeg_filename}'...")
     else:
-        cv2.namedWindow("MJPEG Stream", cv2.WINDOW_NORMAL)
+        display_thread = threading.Thread(target=display_worker, daemon=True)
+        display_thread.start()
+
+    # Per-packet hot path: bind module-level lookups to locals once
+    recv = receiver.recv
+    parse = parse_mjpeg_packet
+    process = process_fragment
+    frame_state = current_frame
 
     try:
         while running:
             try:
-                data, _ = sock.recvfrom(65535)
-                if not data:
-                    continue
-                fragments_received += 1
-
-                packet = parse_mjpeg_packet(data)
-                if packet is None:
-                    continue
-
-                jpeg_bytes = process_fragment(current_frame, packet)
-                if jpeg_bytes:
-                    frames_decoded += 1
-
-                    if save_mjpeg:
-                        try:
-                            mjpeg_file.write(jpeg_bytes)
-                        except Exception as e:
-                            print("[main] Error writing MJPEG:", e)
-                    else:
-                        img = cv2.imdecode(np.frombuffer(jpeg_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
-                        if img is None:
-                            frames_dropped += 1
+                packets = recv()
+                fragments_received += len(packets)
+                for data in packets:
+                    packet = parse(data)
+                    if packet is None:
+                        continue
+
+                    jpeg_bytes = process(frame_state, packet)
+                    if jpeg_bytes:
+                        if save_mjpeg:
+                            frames_decoded += 1
+                            try:
+                                write_all(mjpeg_file, jpeg_bytes)
+                            except Exception as e:
+                                print("[main] Error writing MJPEG:", e)
                         else:
-                            if event_signal.is_set():
-                                tsf = datetime.datetime.now().strftime("%d%m%Y-%H%M%S")
-                                fname = f"frame_{tsf}.jpg"
-                                try:
-                                    cv2.imwrite(fname, img)
-                                    print(f"[event] Frame saved due to remote event: {fname}")
-                                except Exception as e:
-                                    print("[event] Error saving frame:", e)
-                                event_signal.clear()
-
-                            cv2.imshow("MJPEG Stream", img)
-                            key = cv2.waitKey(1) & 0xFF
-                            if key == ord('q'):
-                                running = False
-                                break
-                            elif key == ord('s'):
-                                tsf = datetime.datetime.now().strftime("%d%m%Y-%H%M%S")
-                                fname = f"frame_{tsf}.jpg"
-                                cv2.imwrite(fname, img)
-                                print(f"[main] Frame saved: {fname}")
+                            queue_frame(jpeg_bytes)
+                            # The display thread owns that buffer now
+                            frame_state.buf = memoryview(_free_frame_buffers.pop())
 
             except socket.timeout:
-                if current_frame["start_time"] is not None:
-                    if time.time() - current_frame["start_time"] > FRAME_TIMEOUT:
-                        current_frame["buffer"] = bytearray()
-                        current_frame["expected_frag"] = 0
-                        current_frame["start_time"] = None
+                if current_frame.start_ns is not None:
+                    if _now_ns() - current_frame.start_ns > FRAME_TIMEOUT_NS:
+                        current_frame.offset = 0
+                        current_frame.expected_frag = 0
+                        current_frame.start_ns = None
                         frames_dropped += 1
                 continue
 
@@ -325,7 +592,8 @@ def main(save_mjpeg=False):
             pass
 
         if not save_mjpeg:
-            cv2.destroyAllWindows()
+            running = False
+            display_thread.join(timeout=2 * SOCKET_TIMEOUT)
         try:
             sock.close()
         except Exception:
@@ -333,7 +601,7 @@ def main(save_mjpeg=False):
 
         print("=== Statistics ===")
         print(f"Frames decoded: {frames_decoded}")
-        print(f"Frames dropped: {frames_dropped}")
+        print(f"Frames dropped: {frames_dropped + frames_undecodable}")
         print(f"Fragments received: {fragments_received}")
 
 # -------------------------